@@ -23,6 +23,7 @@ Label cleaning rules:
 """
 
 import argparse
+import functools
 import re
 from pathlib import Path
 from typing import Optional, Tuple, List
@@ -34,7 +35,10 @@ RE_METRIC_QUERY = re.compile(r'vars\.check_prometheus_metric_query\s*=\s*(["\'])
 RE_WARN         = re.compile(r'vars\.check_prometheus_metric_warning\s*=\s*(["\'])(.*?)\1', re.DOTALL)
 RE_CRIT         = re.compile(r'vars\.check_prometheus_metric_critical\s*=\s*(["\'])(.*?)\1', re.DOTALL)
 
-def extract(text: str, regex: re.Pattern) -> Optional[str]:
+def extract(text: str, literal: str, regex: re.Pattern) -> Optional[str]:
+  # Cheap substring probe first: skip the regex sweep when the variable is absent.
+  if literal not in text:
+    return None
   m = regex.search(text)
   if not m:
     return None
@@ -53,61 +57,48 @@ def parse_threshold(raw: Optional[str]) -> Optional[str]:
     return right if right not in ("", "~") else left.strip()
   return s
 
+@functools.lru_cache(maxsize=1024)
 def metric_to_slug(name: str) -> str:
   return name.strip().lower().replace("_", "-")
 
+@functools.lru_cache(maxsize=1024)
 def metric_to_words(name: str) -> str:
   return name.strip().lower().replace("_", " ")
 
 # --- Query cleaning utilities ---
 
+# One label matcher: quoted strings (which may contain commas) or any other non-comma chars
+_MATCHER_SPLIT_RE = re.compile(r'(?:"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[^,])+')
+
 def _split_label_matchers(s: str) -> List[str]:
   """Split label matchers by commas *outside* quotes; return raw matcher strings."""
-  parts = []
-  buf = []
-  in_single = False
-  in_double = False
-  esc = False
-  for ch in s:
-    if esc:
-      buf.append(ch)
-      esc = False
-      continue
-    if ch == "\\":
-      buf.append(ch)
-      esc = True
-      continue
-    if ch == "'" and not in_double:
-      in_single = not in_single
-      buf.append(ch)
-      continue
-    if ch == '"' and not in_single:
-      in_double = not in_double
-      buf.append(ch)
-      continue
-    if ch == "," and not in_single and not in_double:
-      parts.append("".join(buf).strip())
-      buf = []
-      continue
-    buf.append(ch)
-  if buf:
-    parts.append("".join(buf).strip())
-  return [p for p in parts if p]
+  return [p for p in (m.group(0).strip() for m in _MATCHER_SPLIT_RE.finditer(s)) if p]
 
 _PLACEHOLDER_RE = re.compile(r'(%[^%]+%|\{\{[^}]+\}\}|\$\{[^}]+\}|\$[A-Za-z_][A-Za-z0-9_]*)')
 _LABEL_MATCHER_RE = re.compile(r'^\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*(=~|!~|=|!=)\s*(.+?)\s*$')
-
+# Either a quoted string (skipped as-is) or a `{ ... }` label set whose content
+# (group 1) may itself contain quoted strings with braces or commas.
+_LABELSET_RE = re.compile(
+  r'"(?:\\.|[^"\\])*"'
+  r"|'(?:\\.|[^'\\])*'"
+  r"""|\{((?:"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|[^{}"'])*)\}"""
+)
+
+# Memoized: batch conversions of .conf files often share the same query template.
+@functools.lru_cache(maxsize=4096)
 def clean_query(expr: str) -> str:
   """
   Remove label matchers whose values contain placeholders (e.g., hostname='%HOSTNAME%').
   If a label set becomes empty, remove the entire `{ ... }`.
-  Brace/quote aware.
+  Brace/quote aware: a single regex pass finds label sets outside quoted strings.
   """
   def has_placeholder(s: str) -> bool:
     return bool(_PLACEHOLDER_RE.search(s))
 
   def reconstruct_labelset(content: str) -> str:
     matchers = _split_label_matchers(content)
+    # One search over the whole label set; per-matcher checks only if it finds something
+    any_placeholder = has_placeholder(content)
     kept = []
     for m in matchers:
       mobj = _LABEL_MATCHER_RE.match(m.strip())
@@ -118,76 +109,20 @@ def clean_query(expr: str) -> str:
       key, op, val = mobj.groups()
       v = val.strip()
       inner = v[1:-1] if (len(v) >= 2 and ((v[0] == v[-1] == '"') or (v[0] == v[-1] == "'"))) else v
-      if has_placeholder(inner):
+      if any_placeholder and has_placeholder(inner):
         continue
       kept.append(f"{key}{op}{v}" if v == val.strip() else m.strip())
     if not kept:
       return ""  # signal to remove entire label set
     return "{" + ", ".join(kept) + "}"
 
-  out = []
-  i = 0
-  n = len(expr)
-  in_single = in_double = False
-  while i < n:
-    ch = expr[i]
-    if ch == "'" and not in_double:
-      in_single = not in_single
-      out.append(ch)
-      i += 1
-      continue
-    if ch == '"' and not in_single:
-      in_double = not in_double
-      out.append(ch)
-      i += 1
-      continue
-    if ch == "{" and not in_single and not in_double:
-      # capture until matching }
-      depth = 1
-      j = i + 1
-      sub_in_single = sub_in_double = False
-      content = []
-      while j < n and depth > 0:
-        cj = expr[j]
-        if cj == "'" and not sub_in_double:
-          sub_in_single = not sub_in_single
-          content.append(cj)
-          j += 1
-          continue
-        if cj == '"' and not sub_in_single:
-          sub_in_double = not sub_in_double
-          content.append(cj)
-          j += 1
-          continue
-        if cj == "{" and not sub_in_single and not sub_in_double:
-          depth += 1
-          content.append(cj)
-          j += 1
-          continue
-        if cj == "}" and not sub_in_single and not sub_in_double:
-          depth -= 1
-          if depth == 0:
-            j += 1
-            break
-          content.append(cj)
-          j += 1
-          continue
-        content.append(cj)
-        j += 1
-      inner = "".join(content)
-      rebuilt = reconstruct_labelset(inner) if ("{" not in inner and "}" not in inner) else "{" + inner + "}"
-      if rebuilt == "":
-        # remove entire label set
-        pass
-      else:
-        out.append(rebuilt)
-      i = j
-      continue
-    out.append(ch)
-    i += 1
-  result = "".join(out)
-  result = result.replace("{ ", "{").replace(" }", "}")
-  return result
+  def replace(m: re.Match) -> str:
+    content = m.group(1)
+    if content is None:
+      return m.group(0)  # quoted string outside a label set: keep verbatim
+    return reconstruct_labelset(content)
+
+  return _LABELSET_RE.sub(replace, expr)
 
 # --- YAML building ---
 
@@ -207,11 +142,11 @@ def build_rule_block(metric_for_text: str, expr_left: str, threshold: str, sever
 
 def convert_conf_to_yaml(conf_text: str) -> Tuple[str, str]:
   # Extract fields
-  service_name = extract(conf_text, RE_SERVICE_NAME) or "unnamed_service"
-  metric_name = extract(conf_text, RE_METRIC_NAME) or service_name
-  metric_query = extract(conf_text, RE_METRIC_QUERY)
-  warn_raw = extract(conf_text, RE_WARN)
-  crit_raw = extract(conf_text, RE_CRIT)
+  service_name = extract(conf_text, "apply", RE_SERVICE_NAME) or "unnamed_service"
+  metric_name = extract(conf_text, "vars.check_prometheus_metric_name", RE_METRIC_NAME) or service_name
+  metric_query = extract(conf_text, "vars.check_prometheus_metric_query", RE_METRIC_QUERY)
+  warn_raw = extract(conf_text, "vars.check_prometheus_metric_warning", RE_WARN)
+  crit_raw = extract(conf_text, "vars.check_prometheus_metric_critical", RE_CRIT)
 
   warn = parse_threshold(warn_raw)
   crit = parse_threshold(crit_raw)
@@ -233,21 +168,17 @@ def convert_conf_to_yaml(conf_text: str) -> Tuple[str, str]:
     "    rules:\n"
   )
 
-  rules = ""
+  parts = [header]
   if warn is not None:
-    rules += build_rule_block(metric_name, expr_left, warn, "warning")
-    if not rules.endswith("\n"):
-      rules += "\n"
+    parts.append(build_rule_block(metric_name, expr_left, warn, "warning"))
   if crit is not None:
-    if rules and not rules.endswith("\n"):
-      rules += "\n"
-    rules += build_rule_block(metric_name, expr_left, crit, "critical")
+    parts.append(build_rule_block(metric_name, expr_left, crit, "critical"))
 
-  if not rules:
+  if len(parts) == 1:
     # If no thresholds, still output a single rule with just the query (no comparator).
     if metric_query:
       words = metric_to_words(metric_name)
-      rules += (
+      parts.append(
         f"    - alert: {metric_name}\n"
         f"      annotations:\n"
         f"        summary: \"{words}\"\n"
@@ -260,7 +191,7 @@ def convert_conf_to_yaml(conf_text: str) -> Tuple[str, str]:
     else:
       raise ValueError("No thresholds (warning/critical) found and no query available in the .conf file.")
 
-  return metric_name, header + rules
+  return metric_name, "".join(parts)
 
 def main():
   parser = argparse.ArgumentParser(description="Convert myAlert.conf to a VMRule YAML.")
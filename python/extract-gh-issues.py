@@ -5,6 +5,7 @@ Usage:
     --org-v2-project eosnationftw:7 --org-v2-project pinax-network:12 \
     --out export.csv [--users alice,bob]
 Requires: Python 3.9+, requests, a GitHub token via --token or $GITHUB_TOKEN.
+Optional: httpx[http2] — when installed, GraphQL calls share one HTTP/2 connection.
 """
 
 import argparse
@@ -13,14 +14,24 @@ import os
 import sys
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+except ImportError:
+    httpx = None
+
 API_ROOT = "https://api.github.com"
 GQL_ENDPOINT = f"{API_ROOT}/graphql"
 API_VERSION = "2022-11-28"
 USER_AGENT = "pinax-projectv2-export/1.6"
+GH_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"  # what the API emits, e.g. 2024-07-01T12:34:56Z
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+# httpx logs every request at INFO; keep the export's log to our own messages
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 GQL_RESOLVE_PROJECT = """
 query($org: String!, $number: Int!, $cursor: String) {
@@ -42,10 +53,9 @@ query($org: String!, $number: Int!, $cursor: String) {
           }
           fieldValues(first: 50) {
             nodes {
-              __typename
               ... on ProjectV2ItemFieldSingleSelectValue {
                 name
-                field { __typename ... on ProjectV2SingleSelectField { name } }
+                field { ... on ProjectV2SingleSelectField { name } }
               }
             }
           }
@@ -59,13 +69,18 @@ query($org: String!, $number: Int!, $cursor: String) {
 
 class GH:
     def __init__(self, token: str):
-        self.s = requests.Session()
-        self.s.headers.update({
+        headers = {
             "Authorization": f"Bearer {token}",
             "Accept": "application/vnd.github+json",
             "X-GitHub-Api-Version": API_VERSION,
             "User-Agent": USER_AGENT,
-        })
+        }
+        if httpx is not None:
+            # HTTP/2 multiplexes the concurrent project pagers over a single connection.
+            self.s = httpx.Client(http2=True, headers=headers, timeout=60.0)
+        else:
+            self.s = requests.Session()
+            self.s.headers.update(headers)
 
     def gql(self, query: str, variables: dict) -> dict:
         r = self.s.post(GQL_ENDPOINT, json={"query": query, "variables": variables})
@@ -78,12 +93,18 @@ class GH:
         return data["data"]
 
 
+# Projects v2 returns the field name with its exact casing ("Status" for the built-in field).
+_STATUS_NAMES = frozenset({"Status", "status"})
+
+
 def extract_status(field_nodes):
+    # Only single-select values match the inline fragment; other field values come back as {}.
     for fv in field_nodes or []:
-        if fv.get("__typename") == "ProjectV2ItemFieldSingleSelectValue":
-            field = fv.get("field") or {}
-            if field.get("__typename") == "ProjectV2SingleSelectField" and (field.get("name") or "").lower() == "status":
-                return fv.get("name") or ""
+        field = fv.get("field")
+        if not field:
+            continue
+        if field.get("name") in _STATUS_NAMES:
+            return fv.get("name") or ""
     return ""
 
 
@@ -107,6 +128,49 @@ def iter_project_items(gh: GH, org: str, number: int):
         cursor = pi["endCursor"]
 
 
+def parse_gh_timestamp(value: str):
+    """Parse an ISO-8601 timestamp to an aware UTC datetime; None if empty or invalid."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc) if value else None
+    except Exception:
+        return None
+
+
+def project_rows(gh: GH, spec: str, users_filter: set, start_date: datetime, end_date: datetime) -> list:
+    """Return the CSV rows of Done issues in project ORG:NUM matching the filters."""
+    org, num_s = spec.split(":", 1)
+    number = int(num_s)
+    # Fixed-width UTC timestamps order lexicographically, so the common case needs no parsing.
+    start_s = start_date.strftime(GH_TIMESTAMP_FORMAT)
+    end_s = end_date.strftime(GH_TIMESTAMP_FORMAT)
+    rows = []
+    for project_title, node in iter_project_items(gh, org, number):
+        content = node.get("content") or {}
+        if content.get("__typename") != "Issue":
+            continue
+        title = content.get("title") or ""
+        created_at = content.get("createdAt") or ""
+        updated_at = content.get("updatedAt") or ""
+        assignees = [a.get("login") for a in ((content.get("assignees") or {}).get("nodes") or []) if a.get("login")]
+        # Cheap predicates first: the assignee filter runs before status extraction.
+        if users_filter and users_filter.isdisjoint(a.lower() for a in assignees):
+            logging.debug("skip issue no assignee match: %s", title[:120])
+            continue
+        status = extract_status((node.get("fieldValues") or {}).get("nodes", []))
+        if status != "Done":
+            continue
+        if len(updated_at) == 20 and updated_at.endswith("Z"):
+            if not start_s <= updated_at <= end_s:
+                continue
+        else:
+            updated_dt = parse_gh_timestamp(updated_at)
+            if not updated_dt or updated_dt < start_date or updated_dt > end_date:
+                continue
+        url = content.get("url") or ""
+        rows.append([project_title, "Issue", ",".join(assignees), title, status, created_at, updated_at, url])
+    return rows
+
+
 def main():
     ap = argparse.ArgumentParser(description="Export Project v2 Issues filtered by Done and date range")
     ap.add_argument("--org-v2-project", action="append", default=[], help="ORG:NUM; repeatable")
@@ -122,15 +186,15 @@ def main():
         logging.error("Provide at least one --org-v2-project ORG:NUM")
         sys.exit(2)
 
-    users_filter = []
+    users_filter = set()
     if args.users:
         if os.path.isfile(args.users):
             with open(args.users, "r", encoding="utf-8") as f:
-                users_filter = [l.strip().lower() for l in f if l.strip()]
+                users_filter = {l.strip().lower() for l in f if l.strip()}
         else:
-            users_filter = [u.strip().lower() for u in args.users.split(",") if u.strip()]
+            users_filter = {u.strip().lower() for u in args.users.split(",") if u.strip()}
     if users_filter:
-        logging.info("Assignee filter: %s", users_filter)
+        logging.info("Assignee filter: %s", sorted(users_filter))
 
     gh = GH(args.token)
 
@@ -138,37 +202,17 @@ def main():
     end_date = datetime(2025, 6, 30, 23, 59, 59, tzinfo=timezone.utc)
 
     written = 0
-    with open(args.out, "w", newline="", encoding="utf-8") as f:
+    with open(args.out, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
         w = csv.writer(f)
         w.writerow(["Project_title","item_type","assignees","title","status_current","created_at","last_updated_at","url"])
 
-        for spec in args.org_v2_project:
-            org, num_s = spec.split(":", 1)
-            number = int(num_s)
-            for project_title, node in iter_project_items(gh, org, number):
-                content = node.get("content") or {}
-                if content.get("__typename") != "Issue":
-                    continue
-                title = content.get("title") or ""
-                created_at = content.get("createdAt") or ""
-                updated_at = content.get("updatedAt") or ""
-                assignees = [a.get("login") for a in ((content.get("assignees") or {}).get("nodes") or []) if a.get("login")]
-                assignees_lower = [a.lower() for a in assignees]
-                status = extract_status((node.get("fieldValues") or {}).get("nodes", []))
-                if status != "Done":
-                    continue
-                if users_filter and not any(u in assignees_lower for u in users_filter):
-                    logging.debug("skip issue no assignee match: %s", title[:120])
-                    continue
-                try:
-                    updated_dt = datetime.fromisoformat(updated_at.replace("Z", "+00:00")).astimezone(timezone.utc) if updated_at else None
-                except Exception:
-                    updated_dt = None
-                if not updated_dt or updated_dt < start_date or updated_dt > end_date:
-                    continue
-                url = content.get("url") or ""
-                w.writerow([project_title, "Issue", ",".join(assignees), title, status, created_at, updated_at, url])
-                written += 1
+        # Projects are paged concurrently; rows are written here, in --org-v2-project order.
+        with ThreadPoolExecutor(max_workers=len(args.org_v2_project)) as ex:
+            jobs = [ex.submit(project_rows, gh, spec, users_filter, start_date, end_date) for spec in args.org_v2_project]
+            for job in jobs:
+                rows = job.result()
+                w.writerows(rows)
+                written += len(rows)
 
     logging.info("%d rows written to %s", written, args.out)
     if written == 0:
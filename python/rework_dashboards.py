@@ -5,11 +5,50 @@ Functioning: Unwraps exported dashboards, ensures a datasource variable, and rew
 How to use: python3 rework_dashboards.py <input> [--output-dir DIR | --in-place] [--prom-only | --all-sources]
 """
 import argparse
+import fnmatch
 import json
 import os
+import re
 import sys
+from decimal import Decimal
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, Iterator, List, Union
+
+try:
+  import orjson  # optional: much faster parse/serialise for large dashboards
+except ImportError:
+  orjson = None
+
+try:
+  import ijson  # optional: stream-rewrite huge dashboards with a bounded working set
+except ImportError:
+  ijson = None
+
+# Files larger than this are streamed through ijson (when installed) instead of loaded whole.
+STREAM_THRESHOLD = 1 << 20
+
+# A digit run this long may be an integer wider than 64 bits, which orjson turns into a float.
+_LONG_DIGITS_RE = re.compile(rb"\d{19,}")
+
+def load_json(raw: bytes) -> Any:
+  if orjson is not None and not _LONG_DIGITS_RE.search(raw):
+    return orjson.loads(raw)
+  return json.loads(raw)
+
+def dump_json(data: Any) -> bytes:
+  """Serialise as 2-space indented UTF-8 JSON."""
+  if orjson is not None:
+    try:
+      return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    except TypeError:
+      pass  # e.g. an integer wider than 64 bits: json.dumps keeps it exact
+  return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+def write_json(path: Path, data: Any) -> None:
+  # The trailing newline is written separately rather than appended to (and so copying) the document.
+  with path.open("wb") as f:
+    f.write(dump_json(data))
+    f.write(b"\n")
 
 def parse_args():
   p = argparse.ArgumentParser(description="Rework Grafana dashboard JSON files.")
@@ -25,6 +64,25 @@ def parse_args():
   p.add_argument("--dry-run", action="store_true", help="Do not write files, just print what would be done")
   return p.parse_args()
 
+def _walk_matching(root: Path, pattern: str) -> Iterator[Path]:
+  """Like root.rglob(pattern) filtered to files, but using scandir's cached entry types."""
+  if "/" in pattern or os.sep in pattern:
+    yield from (f for f in root.rglob(pattern) if f.is_file())
+    return
+  stack = [os.fspath(root)]
+  while stack:
+    try:
+      it = os.scandir(stack.pop())
+    except OSError:
+      # Unreadable directory: skip it, as rglob does
+      continue
+    with it:
+      for entry in it:
+        if entry.is_dir(follow_symlinks=False):
+          stack.append(entry.path)
+        elif fnmatch.fnmatchcase(entry.name, pattern) and entry.is_file():
+          yield Path(entry.path)
+
 def iter_input_files(paths: List[str], pattern: str) -> List[Path]:
   files: List[Path] = []
   for p in paths:
@@ -32,9 +90,7 @@ def iter_input_files(paths: List[str], pattern: str) -> List[Path]:
     if path.is_file():
       files.append(path)
     elif path.is_dir():
-      for f in path.rglob(pattern):
-        if f.is_file():
-          files.append(f)
+      files.extend(_walk_matching(path, pattern))
     else:
       print(f"⚠️  Not found: {path}", file=sys.stderr)
   return files
@@ -76,81 +132,299 @@ def is_annotation_ds(obj: Any) -> bool:
   # Grafana built-in annotation datasource looks like {"type":"datasource","uid":"grafana"}
   return isinstance(obj, dict) and obj.get("type") == "datasource"
 
-def rewrite_datasources(node: Any, var_name: str, prom_only: bool, rewrite_strings: bool) -> Any:
+def rewrite_datasources(node: Any, var_name: str, prom_only: bool, rewrite_strings: bool) -> None:
   """
-  Recursively rewrite panel/target "datasource" fields to "${VAR_NAME}".
+  Rewrite panel/target "datasource" fields to "${VAR_NAME}" in place.
   - Skip Grafana internal annotation datasource objects.
   - If prom_only is True: only rewrite OBJECT datasources where .type == "prometheus".
     (STRING datasources left as-is unless rewrite_strings is True.)
   - If prom_only is False: rewrite all OBJECT datasources except annotations. STRINGs based on rewrite_strings.
   """
-  if isinstance(node, dict):
-    new_node = {}
-    for k, v in node.items():
-      if k == "datasource":
-        # Determine what to do based on value type
-        if is_annotation_ds(v):
-          # leave annotation datasources untouched
-          new_node[k] = v
-        elif isinstance(v, dict):
-          if prom_only:
-            if v.get("type") == "prometheus":
-              new_node[k] = f"${{{var_name}}}"
-            else:
-              new_node[k] = v
-          else:
-            # rewrite any non-annotation object
-            new_node[k] = f"${{{var_name}}}"
-        elif isinstance(v, str):
-          if rewrite_strings:
-            new_node[k] = f"${{{var_name}}}"
-          else:
-            new_node[k] = v
+  replacement = f"${{{var_name}}}"
+  stack = [node]
+  while stack:
+    cur = stack.pop()
+    if isinstance(cur, dict):
+      for k, v in cur.items():
+        if k == "datasource":
+          # Determine what to do based on value type; datasource values are never descended into
+          if is_annotation_ds(v):
+            # leave annotation datasources untouched
+            continue
+          if isinstance(v, dict):
+            if not prom_only or v.get("type") == "prometheus":
+              cur[k] = replacement
+          elif isinstance(v, str) and rewrite_strings:
+            cur[k] = replacement
+        elif isinstance(v, (dict, list)):
+          stack.append(v)
+    elif isinstance(cur, list):
+      stack.extend(x for x in cur if isinstance(x, (dict, list)))
+
+# --- Streaming path for huge dashboards (ijson) ---
+
+class _IndentedWriter:
+  """Write JSON incrementally in the same layout as json.dumps(indent=2)."""
+  def __init__(self, out):
+    self.out = out
+    self.counts: List[int] = []  # items written so far, per open container
+    self.after_key = False
+
+  def _separate(self) -> None:
+    if self.after_key:
+      self.after_key = False
+      return
+    if self.counts:
+      if self.counts[-1]:
+        self.out.write(",")
+      self.counts[-1] += 1
+      self.out.write("\n" + "  " * len(self.counts))
+
+  def key(self, k: str) -> None:
+    self._separate()
+    self.out.write(json.dumps(k, ensure_ascii=False) + ": ")
+    self.after_key = True
+
+  def value(self, v: Any) -> None:
+    self._separate()
+    text = json.dumps(v, indent=2, ensure_ascii=False, default=_json_default)
+    self.out.write(text.replace("\n", "\n" + "  " * len(self.counts)) if self.counts else text)
+
+  def start(self, bracket: str) -> None:
+    self._separate()
+    self.out.write(bracket)
+    self.counts.append(0)
+
+  def end(self, bracket: str) -> None:
+    if self.counts.pop():
+      self.out.write("\n" + "  " * len(self.counts))
+    self.out.write(bracket)
+
+def _build_value(events, event: str, value: Any) -> Any:
+  """Materialise the JSON value whose first ijson event is (event, value)."""
+  builder = ijson.ObjectBuilder()
+  builder.event(event, value)
+  depth = 1 if event in ("start_map", "start_array") else 0
+  while depth:
+    _, event, value = next(events)
+    builder.event(event, value)
+    if event in ("start_map", "start_array"):
+      depth += 1
+    elif event in ("end_map", "end_array"):
+      depth -= 1
+  return builder.value
+
+def _seek_dashboard(events) -> bool:
+  """
+  Consume events up to the opening brace of a wrapped {"dashboard": {...}}; False if not wrapped.
+  Decides on the first top-level key other than "meta", so an unwrapped dashboard costs a few
+  events rather than a full pass. Limit: a "dashboard" object key that only comes after some
+  other top-level key (Grafana puts it first or right after "meta") is not unwrapped here,
+  unlike the in-memory path.
+  """
+  depth = 0
+  for _, event, value in events:
+    if event in ("start_map", "start_array"):
+      depth += 1
+    elif event in ("end_map", "end_array"):
+      depth -= 1
+    elif depth == 1 and event == "map_key":
+      if value == "dashboard":
+        _, event, value = next(events)
+        if event == "start_map":
+          return True
+        _build_value(events, event, value)
+      elif value != "meta":
+        return False
+  return False
+
+def _json_default(o: Any) -> Any:
+  # ijson yields non-integral numbers as Decimal; json.loads would have made them floats
+  if isinstance(o, Decimal):
+    return float(o)
+  raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+def stream_rework(src_path: Path, out, var_name: str, ds_name: str, prom_only: bool, rewrite_strings: bool) -> None:
+  """
+  Same result as unwrap + ensure_ds_variable + rewrite_datasources, written to `out` as it is parsed.
+  Only "datasource" values and the dashboard's "templating" block are materialised.
+  """
+  with src_path.open("rb") as f:
+    wrapped = _seek_dashboard(ijson.parse(f))
+  with src_path.open("rb") as f:
+    # No use_float: it overflows on integers wider than 64 bits; Decimals are converted on output
+    events = iter(ijson.parse(f))
+    if wrapped:
+      _seek_dashboard(events)
+    elif next(events)[1] != "start_map":
+      raise ValueError("dashboard root is not a JSON object")
+
+    w = _IndentedWriter(out)
+    w.start("{")
+    depth = 1  # relative to the dashboard object
+    seen_templating = False
+    for _, event, value in events:
+      if event == "map_key":
+        if value == "datasource" or (depth == 1 and value == "templating"):
+          _, ev, val = next(events)
+          holder = {value: _build_value(events, ev, val)}
+          if value == "templating":
+            ensure_ds_variable(holder, var_name=var_name, ds_name=ds_name)
+            seen_templating = True
+          rewrite_datasources(holder, var_name=var_name, prom_only=prom_only, rewrite_strings=rewrite_strings)
+          w.key(value)
+          w.value(holder[value])
         else:
-          new_node[k] = v
+          w.key(value)
+      elif event in ("start_map", "start_array"):
+        depth += 1
+        w.start("{" if event == "start_map" else "[")
+      elif event in ("end_map", "end_array"):
+        depth -= 1
+        if depth == 0:
+          if not seen_templating:
+            holder = {}
+            ensure_ds_variable(holder, var_name=var_name, ds_name=ds_name)
+            w.key("templating")
+            w.value(holder["templating"])
+          w.end("}")
+          break
+        w.end("}" if event == "end_map" else "]")
       else:
-        new_node[k] = rewrite_datasources(v, var_name, prom_only, rewrite_strings)
-    return new_node
-  elif isinstance(node, list):
-    return [rewrite_datasources(x, var_name, prom_only, rewrite_strings) for x in node]
-  else:
-    return node
+        w.value(value)
+  out.write("\n")
+
+# Byte patterns for already_reworked(); \s* tolerates both indented and compact JSON.
+_WRAPPER_RE = re.compile(rb'"dashboard"\s*:\s*\{')
+_PROM_TYPE_RE = re.compile(rb'"type"\s*:\s*"prometheus"')
+_DS_OBJECT_RE = re.compile(rb'"datasource"\s*:\s*\{')
+_DS_ANNOTATION_RE = re.compile(rb'"datasource"\s*:\s*\{\s*"type"\s*:\s*"datasource"\s*[,}]')
+_DS_STRING_RE = re.compile(rb'"datasource"\s*:\s*"')
+_TEMPLATING_RE = re.compile(rb'"templating"\s*:\s*\{\s*"list"\s*:\s*\[')
+
+def _ds_variable_re(var_name: str, ds_name: str) -> "re.Pattern[bytes]":
+  """The variable block ensure_ds_variable writes, in its key order, with any whitespace."""
+  def lit(v: Any) -> bytes:
+    return re.escape(json.dumps(v, ensure_ascii=False).encode("utf-8"))
+  def pair(key: str, value: bytes) -> bytes:
+    return lit(key) + rb"\s*:\s*" + value
+  sep = rb"\s*,\s*"
+  current = rb"\{\s*" + sep.join([
+    pair("text", lit(ds_name)), pair("value", lit(ds_name)), pair("selected", rb"true"),
+  ]) + rb"\s*\}"
+  return re.compile(rb"\{\s*" + sep.join([
+    pair("type", lit("datasource")), pair("name", lit(var_name)), pair("label", lit("Datasource")),
+    pair("query", lit("prometheus")), pair("current", current), pair("hide", rb"2"),
+  ]) + rb"\s*\}")
+
+def already_reworked(raw: bytes, var_name: str, ds_name: str, prom_only: bool, all_sources: bool) -> bool:
+  """
+  Cheap byte probes (no JSON parsing) for a dashboard that a run in the current mode
+  would leave unchanged: not wrapped, datasources point at ${VAR_NAME}, the only entry
+  named VAR_NAME is the exact variable block ensure_ds_variable writes, inside a
+  "templating" object, and no datasource this mode rewrites is left: no prometheus
+  object; unless --prom-only, no object other than Grafana annotations (recognised only
+  with "type" first, as Grafana writes them); with --all-sources, no string other than
+  ${VAR_NAME}. Anything undecidable from the bytes answers False.
+  """
+  ref = json.dumps(f"${{{var_name}}}", ensure_ascii=False).encode("utf-8")
+  if ref not in raw:
+    return False
+  names = re.findall(rb'"name"\s*:\s*' + re.escape(json.dumps(var_name, ensure_ascii=False).encode("utf-8")), raw)
+  if len(names) != 1 or not _TEMPLATING_RE.search(raw) or not _ds_variable_re(var_name, ds_name).search(raw):
+    return False
+  if _WRAPPER_RE.search(raw) or _PROM_TYPE_RE.search(raw):
+    return False
+  if not prom_only and len(_DS_OBJECT_RE.findall(raw)) != len(_DS_ANNOTATION_RE.findall(raw)):
+    return False
+  if all_sources:
+    ours = re.compile(rb'"datasource"\s*:\s*' + re.escape(ref))
+    if len(_DS_STRING_RE.findall(raw)) != len(ours.findall(raw)):
+      return False
+  return True
+
+def output_path(path: Path, outdir: Union[Path, None], in_place: bool) -> Path:
+  if in_place:
+    return path
+  if outdir:
+    rel = path.name if path.is_file() else path.as_posix()
+    return Path(outdir) / Path(rel).name
+  return path.with_name(path.stem + "_reworked.json")
+
+def stream_process_file(path: Path, outdir: Union[Path, None], in_place: bool, var_name: str, ds_name: str,
+                        prom_only: bool, all_sources: bool, dry_run: bool) -> Union[Path, None]:
+  """
+  process_file for files above STREAM_THRESHOLD. Unlike the in-memory path it has no
+  already_reworked() shortcut (every file is rewritten) and, with --dry-run, it does not
+  parse the file, so invalid JSON is only reported on a real run.
+  """
+  out_path = output_path(path, outdir, in_place)
+  if dry_run:
+    print(f"DRY-RUN would write: {out_path}")
+    return out_path
+
+  # Write next to the destination first: with --in-place the source is still being read.
+  tmp_path = out_path.with_name(out_path.name + ".tmp")
+  try:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with tmp_path.open("w", encoding="utf-8", buffering=1 << 20) as out:
+      stream_rework(path, out, var_name=var_name, ds_name=ds_name,
+                    prom_only=prom_only, rewrite_strings=all_sources)
+    os.replace(tmp_path, out_path)
+    print(f"✅ Wrote {out_path}")
+    return out_path
+  except Exception as e:
+    tmp_path.unlink(missing_ok=True)
+    print(f"❌ Failed to stream-rework {path}: {e}", file=sys.stderr)
+    return None
 
 def process_file(path: Path, outdir: Union[Path, None], in_place: bool, var_name: str, ds_name: str,
          prom_only: bool, all_sources: bool, dry_run: bool) -> Union[Path, None]:
+  if ijson is not None and path.stat().st_size > STREAM_THRESHOLD:
+    return stream_process_file(path, outdir, in_place, var_name, ds_name, prom_only, all_sources, dry_run)
+
   try:
-    raw = path.read_text(encoding="utf-8")
-    data = json.loads(raw)
+    raw = path.read_bytes()
+    reworked = already_reworked(raw, var_name, ds_name, prom_only, all_sources)
+    data = None if reworked else load_json(raw)
   except Exception as e:
     print(f"❌ Failed to read/parse {path}: {e}", file=sys.stderr)
     return None
 
+  if reworked:
+    out_path = output_path(path, outdir, in_place)
+    if in_place or dry_run:
+      print(f"⏭  skipped (already reworked): {path}")
+      return out_path
+    # Still produce the expected output file, byte-for-byte unchanged
+    try:
+      out_path.parent.mkdir(parents=True, exist_ok=True)
+      out_path.write_bytes(raw)
+      print(f"⏭  copied unchanged (already reworked): {out_path}")
+      return out_path
+    except Exception as e:
+      print(f"❌ Failed to write {out_path}: {e}", file=sys.stderr)
+      return None
+
   # 1) Unwrap {"dashboard": {...}, "meta": {...}} to just {...}
   dash = unwrap_dashboard_root(data)
 
   # 2) Ensure templating variable
   ensure_ds_variable(dash, var_name=var_name, ds_name=ds_name)
 
-  # 3) Rewrite datasources
+  # 3) Rewrite datasources (nothing to walk if no "datasource" key appears anywhere in the file)
   rewrite_strings = all_sources  # only rewrite strings when --all-sources is used
-  dash = rewrite_datasources(dash, var_name=var_name, prom_only=prom_only, rewrite_strings=rewrite_strings)
-
-  # Decide output path
-  if in_place:
-    out_path = path
-  elif outdir:
-    rel = path.name if path.is_file() else path.as_posix()
-    out_path = Path(outdir) / Path(rel).name
-  else:
-    out_path = path.with_name(path.stem + "_reworked.json")
+  if b'"datasource"' in raw:
+    rewrite_datasources(dash, var_name=var_name, prom_only=prom_only, rewrite_strings=rewrite_strings)
 
+  out_path = output_path(path, outdir, in_place)
   if dry_run:
     print(f"DRY-RUN would write: {out_path}")
     return out_path
 
   try:
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(dash, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    write_json(out_path, dash)
     print(f"✅ Wrote {out_path}")
     return out_path
   except Exception as e:
@@ -3,13 +3,35 @@
 import os
 import sys
 import json
+import re
+import time
 import logging
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from decimal import Decimal
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+try:
+  import ijson  # optional: stream catalog pages instead of materialising them whole
+except ImportError:
+  ijson = None
+
+try:
+  import httpx  # optional: HTTP/2 client for the catalog API
+  import h2  # noqa: F401  (httpx needs it for http2=True)
+except ImportError:
+  httpx = None
+
+try:
+  import orjson  # optional: faster JSON decoding of API responses and result output
+except ImportError:
+  orjson = None
+
 # =======================
 # Configuration loading
 # =======================
@@ -22,6 +44,23 @@ logging.basicConfig(
   format="%(asctime)s %(levelname)s %(message)s"
 )
 logger = logging.getLogger("spm-checker")
+# httpx logs every request at INFO; keep stderr to our own messages
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+def _json_default(o):
+  # Streamed pages (ijson) carry non-integral numbers as Decimal
+  if isinstance(o, Decimal):
+    return float(o)
+  raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class _LazyJson:
+  """Log argument that is only serialised if the record is actually emitted."""
+  def __init__(self, obj, indent=None):
+    self.obj = obj
+    self.indent = indent
+
+  def __str__(self):
+    return json.dumps(self.obj, indent=self.indent, ensure_ascii=False, default=_json_default)
 
 # ---- API config / Type & attribute names ----
 BASE = os.getenv("INCIDENT_API_BASE", "https://api.incident.io")
@@ -32,10 +71,23 @@ ALERTMANAGER_ENABLE = os.getenv("ALERTMANAGER_ENABLE", "true")
 ALERTMANAGER_URL = os.getenv("ALERTMANAGER_URL", "http://vmalertmanager-vmks-victoria-metrics-k8s-stack.monitoring.svc")
 ALERTMANAGER_ROUTE = os.getenv("ALERTMANAGER_ROUTE", "/api/v2/alerts")
 ALERTMANAGER_TIMEOUT = float(os.getenv("ALERTMANAGER_TIMEOUT", "10"))
+ALERTMANAGER_VERIFY_TLS = os.getenv("ALERTMANAGER_VERIFY_TLS", "false").lower() == "true"
 ALERTMANAGER_ALERTNAME = os.getenv("ALERTMANAGER_ALERTNAME", "IncidentStatusPageMapDrift")
 ALERTMANAGER_SEVERITY = os.getenv("ALERTMANAGER_SEVERITY", "warning")
 ALERTMANAGER_COMPONENT_LABEL = os.getenv("ALERTMANAGER_COMPONENT_LABEL", "monitoring")
 ALERTMANAGER_EXTRA_LABELS_JSON = os.getenv("ALERTMANAGER_EXTRA_LABELS_JSON", "")  # e.g. {"env":"prod"}
+ALERTMANAGER_ANNOTATION_MAX_LINES = int(os.getenv("ALERTMANAGER_ANNOTATION_MAX_LINES", "20"))
+
+# Optional extra labels as JSON, parsed once
+_EXTRA_LABELS = {}
+if ALERTMANAGER_EXTRA_LABELS_JSON:
+  try:
+    _EXTRA_LABELS = json.loads(ALERTMANAGER_EXTRA_LABELS_JSON)
+    if not isinstance(_EXTRA_LABELS, dict):
+      raise ValueError(f"expected a JSON object, got {type(_EXTRA_LABELS).__name__}")
+  except Exception as e:
+    _EXTRA_LABELS = {}
+    logger.warning("ALERTMANAGER_EXTRA_LABELS_JSON invalid JSON: %s", e)
 
 # Logical type names — case-insensitive.
 TYPE_NAMES = {
@@ -55,74 +107,180 @@ ATTR_NAMES = {
   "spm_network":   os.getenv("SPM_NETWORK_ATTR_NAME", "Network associated"),
 }
 
+# Lower-cased once for the case-insensitive lookups
+TYPE_NAMES_LC = {k: v.lower() for k, v in TYPE_NAMES.items()}
+ATTR_NAMES_LC = {k: v.lower() for k, v in ATTR_NAMES.items()}
+
 if not TOKEN:
   print("Missing INCIDENT_API_TOKEN", file=sys.stderr)
   sys.exit(2)
 
-S = requests.Session()
-S.headers.update({"Authorization": f"Bearer {TOKEN}"})
+# Catalog API retry policy, shared by both clients below
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.3
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+if httpx is not None:
+  class _RetryTransport(httpx.HTTPTransport):
+    """
+    httpx's own retries=N only covers failed connections; this also retries GETs answered
+    with RETRY_STATUSES, sleeping like urllib3's Retry (0s, then backoff * 2**n, or Retry-After).
+    """
+    def handle_request(self, request):
+      for attempt in range(RETRY_TOTAL + 1):
+        response = super().handle_request(request)
+        if (attempt == RETRY_TOTAL or request.method != "GET"
+            or response.status_code not in RETRY_STATUSES):
+          return response
+        retry_after = response.headers.get("Retry-After", "")
+        response.close()
+        if retry_after.isdigit():
+          delay = float(retry_after)
+        else:
+          delay = RETRY_BACKOFF * (2 ** (attempt - 1)) if attempt else 0.0
+        time.sleep(delay)
+
+  # HTTP/2: concurrent catalog requests multiplex over one TCP+TLS connection
+  S = httpx.Client(
+    headers={"Authorization": f"Bearer {TOKEN}"},
+    transport=_RetryTransport(
+      http2=True, retries=RETRY_TOTAL,
+      limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+    ),
+  )
+else:
+  S = requests.Session()
+  S.headers.update({"Authorization": f"Bearer {TOKEN}"})
+  # Pooled keep-alive connections to the catalog API, retrying transient errors (GETs only)
+  _adapter = HTTPAdapter(
+    pool_connections=32, pool_maxsize=32,
+    max_retries=Retry(total=RETRY_TOTAL, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUSES),
+  )
+  S.mount("https://", _adapter)
+  S.mount("http://", _adapter)
+
+# Page streaming reads the urllib3 body directly, so it needs the requests session
+STREAM_PAGES = ijson is not None and httpx is None
+
+# Separate session for Alertmanager: different host, no catalog auth header
+AM = requests.Session()
 
 
 # =======================
 # incident.io API helpers
 # =======================
+# A digit run this long may be an integer wider than 64 bits, which orjson turns into a float
+_LONG_DIGITS_RE = re.compile(rb"\d{19,}")
+
+def _loads(r):
+  """Decode a JSON response body (orjson when available, else the client's stdlib decoding)."""
+  if orjson is not None:
+    body = r.content
+    if not _LONG_DIGITS_RE.search(body):
+      return orjson.loads(body)
+  return r.json()
+
 def list_types():
   r = S.get(f"{BASE}/v3/catalog_types", timeout=30)
   r.raise_for_status()
-  return r.json()["catalog_types"]
-
-def find_type(types, name):
+  types = _loads(r)["catalog_types"]
+  for t in types:
+    t["_by_id"], t["_by_name"] = _index_attrs(t)
+  return types
+
+def _index_attrs(cat_type):
+  """Return ({id: attr}, {lowercased name: attr}) for a type's schema; first match wins."""
+  by_id, by_name = {}, {}
+  for a in cat_type.get("schema",{}).get("attributes",[]):
+    if a.get("id") is not None:
+      by_id.setdefault(a["id"], a)
+    by_name.setdefault((a.get("name","") or "").lower(), a)
+  return by_id, by_name
+
+def find_type(types, name, name_low=None):
+  name_low = name_low or name.lower()
   for t in types:
-    if (t.get("name","") or "").lower() == name.lower():
+    if (t.get("name","") or "").lower() == name_low:
       return t
   raise RuntimeError(f"Catalog type not found: {name}")
 
-def attr_id_by_name_or_id(cat_type, key):
+def attr_id_by_name_or_id(cat_type, key, key_low=None):
   """
   Return (attribute_id, attribute_object) matching either by name (case-insensitive)
-  or by exact id if 'key' looks like an id.
+  or by exact id if 'key' looks like an id. 'key_low' is key already lower-cased, if known.
   """
-  attrs = cat_type.get("schema",{}).get("attributes",[])
+  if "_by_id" not in cat_type:
+    cat_type["_by_id"], cat_type["_by_name"] = _index_attrs(cat_type)
   # 1) Try by exact id
-  for a in attrs:
-    if key == a.get("id"):
-      return a["id"], a
+  a = cat_type["_by_id"].get(key)
+  if a is not None:
+    return a["id"], a
   # 2) Try by name (case-insensitive)
-  key_low = (key or "").lower()
-  for a in attrs:
-    if (a.get("name","") or "").lower() == key_low:
-      return a["id"], a
+  a = cat_type["_by_name"].get(key_low or (key or "").lower())
+  if a is not None:
+    return a["id"], a
   # 3) Nothing found
   raise RuntimeError(f"Attribute not found on type '{cat_type.get('name')}': {key}")
 
+def _stream_entries(r, meta):
+  """
+  Yield catalog_entries one by one while the page body is still being read (ijson),
+  and record pagination_meta.after into `meta`.
+  """
+  r.raw.decode_content = True  # let urllib3 undo any gzip/deflate
+  builder = None
+  # No use_float: it overflows on integers wider than 64 bits (non-integers come back as Decimal)
+  for prefix, event, value in ijson.parse(r.raw):
+    if builder is not None:
+      builder.event(event, value)
+      if prefix == "catalog_entries.item" and event == "end_map":
+        yield builder.value
+        builder = None
+    elif prefix == "catalog_entries.item" and event == "start_map":
+      builder = ijson.ObjectBuilder()
+      builder.event(event, value)
+    elif prefix == "pagination_meta.after" and event == "string":
+      meta["after"] = value
+
 def paginate_entries(catalog_type_id):
   after = None
   while True:
     params = {"catalog_type_id": catalog_type_id, "page_size": 250}
     if after:
       params["after"] = after
-    r = S.get(f"{BASE}/v3/catalog_entries", params=params, timeout=60)
-    r.raise_for_status()
-    data = r.json()
-    for e in data.get("catalog_entries", []):
-      yield e
-    after = data.get("pagination_meta", {}).get("after")
+    if STREAM_PAGES:
+      with S.get(f"{BASE}/v3/catalog_entries", params=params, timeout=60, stream=True) as r:
+        r.raise_for_status()
+        meta = {}
+        yield from _stream_entries(r, meta)
+        after = meta.get("after")
+    else:
+      r = S.get(f"{BASE}/v3/catalog_entries", params=params, timeout=60)
+      r.raise_for_status()
+      data = _loads(r)
+      for e in data.get("catalog_entries", []):
+        yield e
+      after = data.get("pagination_meta", {}).get("after")
     if not after:
       break
 
 def show_entry(entry_id):
   r = S.get(f"{BASE}/v3/catalog_entries/{entry_id}", timeout=30)
   r.raise_for_status()
-  return r.json()["catalog_entry"]
+  return _loads(r)["catalog_entry"]
 
 
 # ===========================================
 # Helpers for resolving & extracting values
 # ===========================================
+# external_id index value: resolved id/name plus the full listed entry (with attribute_values)
+IdxEntry = namedtuple("IdxEntry", "id name entry")
+
 def build_extindex(catalog_type_id):
   """
-  Build an index external_id -> (id, name) for a given type.
-  Useful to resolve Custom[...] attributes (value.literal = external_id).
+  Build an index external_id -> IdxEntry(id, name, entry) for a given type.
+  Useful to resolve Custom[...] attributes (value.literal = external_id); the carried
+  entry means resolved entries never need to be re-fetched one by one.
   """
   idx = {}
   count = 0
@@ -130,7 +288,7 @@ def build_extindex(catalog_type_id):
     count += 1
     ext = e.get("external_id")
     if ext:
-      idx[ext] = (e["id"], e.get("name") or ext)
+      idx[ext] = IdxEntry(e["id"], e.get("name") or ext, e)
   logger.info("Index built for type %s (entries=%d, external_ids=%d)",
         catalog_type_id, count, len(idx))
   return idx
@@ -150,8 +308,8 @@ def extract_single_custom(attr_value_obj, ext_index=None):
   lit = v.get("literal")
   if lit is not None:
     if ext_index:
-      rid, rname = ext_index.get(lit, (None, v.get("label") or lit))
-      return (rid, rname)
+      hit = ext_index.get(lit)
+      return (hit.id, hit.name) if hit else (None, v.get("label") or lit)
     return (None, v.get("label") or lit)
 
   # Legacy format: catalog_entry object
@@ -164,6 +322,73 @@ def extract_single_custom(attr_value_obj, ext_index=None):
   # Last resort: label
   return (None, v.get("label"))
 
+def extract_single_fast(attr_value_obj, ext_index):
+  """
+  Specialised extract_single_custom for the current V3 Custom[...] format
+  ({"value": {"literal": ..., "label": ...}}) with an index: a single lookup, no fallback chain.
+  Anything else (legacy catalog_entry, missing literal, no index) goes to the generic function.
+  """
+  if not attr_value_obj:
+    return (None, None)
+  try:
+    v = attr_value_obj["value"]
+    lit = v["literal"]
+  except (KeyError, TypeError):
+    return extract_single_custom(attr_value_obj, ext_index)
+  if lit is None or not ext_index:
+    return extract_single_custom(attr_value_obj, ext_index)
+  hit = ext_index.get(lit)
+  return (hit.id, hit.name) if hit else (None, v.get("label") or lit)
+
+def _extract_array_item(item, ext_index):
+  """Generic handler for one array_value item (any format); None if nothing usable."""
+  if not isinstance(item, dict):
+    return None
+
+  # --- Flat format: {label, literal}
+  if "literal" in item or "label" in item:
+    lit = item.get("literal")
+    lab = item.get("label")
+    if lit is None:
+      return (None, lab, None)
+    hit = ext_index.get(lit) if ext_index else None
+    return (hit.id, hit.name, lit) if hit else (None, lab or lit, lit)
+
+  # --- Format with 'value': {...}
+  v = item.get("value") or {}
+
+  # 2.1) Custom[...] via literal/label
+  lit = v.get("literal")
+  if lit is not None:
+    hit = ext_index.get(lit) if ext_index else None
+    return (hit.id, hit.name, lit) if hit else (None, v.get("label") or lit, lit)
+
+  # 2.2) Legacy relational format via catalog_entry
+  ce = v.get("catalog_entry") or {}
+  rid = ce.get("catalog_entry_id")
+  rname = ce.get("catalog_entry_name")
+  if rid or rname:
+    return (rid, rname, None)
+  return None
+
+def _extract_flat_items(arr, ext_index):
+  """Tight loop for the (current V3) flat {label, literal} format; other items use the generic path."""
+  out = []
+  get = ext_index.get if ext_index else None
+  for item in arr:
+    if not isinstance(item, dict) or not ("literal" in item or "label" in item):
+      r = _extract_array_item(item, ext_index)
+      if r:
+        out.append(r)
+      continue
+    lit = item.get("literal")
+    if lit is None:
+      out.append((None, item.get("label"), None))
+      continue
+    hit = get(lit) if get else None
+    out.append((hit.id, hit.name, lit) if hit else (None, item.get("label") or lit, lit))
+  return out
+
 def extract_array_custom(attr_value_obj, ext_index=None):
   """
   Handle 'array' attributes containing Custom[...] references to catalog entries.
@@ -182,44 +407,12 @@ def extract_array_custom(attr_value_obj, ext_index=None):
 
   arr = attr_value_obj.get("array_value")
   if isinstance(arr, list) and arr:
-    for item in arr:
-      if not isinstance(item, dict):
-        continue
-
-      # --- Flat format: {label, literal}
-      if "literal" in item or "label" in item:
-        lit = item.get("literal")
-        lab = item.get("label")
-        if lit is not None:
-          if ext_index:
-            rid, rname = ext_index.get(lit, (None, lab or lit))
-            out.append((rid, rname, lit))
-          else:
-            out.append((None, lab or lit, lit))
-        else:
-          out.append((None, lab, None))
-        continue
-
-      # --- Format with 'value': {...}
-      v = (item or {}).get("value") or {}
-
-      # 2.1) Custom[...] via literal/label
-      lit = v.get("literal")
-      if lit is not None:
-        lab = v.get("label") or lit
-        if ext_index:
-          rid, rname = ext_index.get(lit, (None, lab))
-          out.append((rid, rname, lit))
-        else:
-          out.append((None, lab, lit))
-        continue
-
-      # 2.2) Legacy relational format via catalog_entry
-      ce = v.get("catalog_entry") or {}
-      rid = ce.get("catalog_entry_id")
-      rname = ce.get("catalog_entry_name")
-      if rid or rname:
-        out.append((rid, rname, None))
+    # Arrays are normally homogeneous: pick the loop from the first item's format
+    first = next((it for it in arr if isinstance(it, dict)), None)
+    if first is not None and ("literal" in first or "label" in first):
+      out = _extract_flat_items(arr, ext_index)
+    else:
+      out = [r for r in (_extract_array_item(it, ext_index) for it in arr) if r]
 
   # Fallback if the API returns a simple value instead of an array
   if not out:
@@ -247,22 +440,17 @@ def send_alert_to_alertmanager(diff_count, missing):
     "severity": ALERTMANAGER_SEVERITY,
     "component": ALERTMANAGER_COMPONENT_LABEL,
   }
-  # Optional extra labels as JSON
-  if ALERTMANAGER_EXTRA_LABELS_JSON:
-    try:
-      labels.update(json.loads(ALERTMANAGER_EXTRA_LABELS_JSON))
-    except Exception as e:
-      logger.warning("ALERTMANAGER_EXTRA_LABELS_JSON invalid JSON: %s", e)
+  labels.update(_EXTRA_LABELS)
 
   # Compose a readable preview list (limited)
-  MAX_LINES = int(os.getenv("ALERTMANAGER_ANNOTATION_MAX_LINES", "20"))
-  lines = []
-  for i, m in enumerate(missing[:MAX_LINES], start=1):
-    comp = f'{m.get("component_name") or m.get("component_id")}'
-    net  = f'{m.get("network_name") or m.get("network_id")}'
-    lines.append(f"{i}. {comp} ↔ {net}")
-  if len(missing) > MAX_LINES:
-    lines.append(f"... (+{len(missing)-MAX_LINES} more)")
+  # `missing` entries are built in main() with all four keys present
+  lines = [
+    f'{i}. {m["component_name"] or m["component_id"]} ↔ {m["network_name"] or m["network_id"]}'
+    for i, m in enumerate(missing[:ALERTMANAGER_ANNOTATION_MAX_LINES], start=1)
+  ]
+  truncated = len(missing) - ALERTMANAGER_ANNOTATION_MAX_LINES
+  if truncated > 0:
+    lines.append(f"... (+{truncated} more)")
 
   annotations = {
     "summary": f"{diff_count} Status Page Map mapping(s) missing",
@@ -278,9 +466,9 @@ def send_alert_to_alertmanager(diff_count, missing):
   headers = {"Content-Type": "application/json"}
 
   try:
-    r = requests.post(
+    r = AM.post(
       url, json=[alert], headers=headers,
-      timeout=ALERTMANAGER_TIMEOUT, verify="false"
+      timeout=ALERTMANAGER_TIMEOUT, verify=ALERTMANAGER_VERIFY_TLS
     )
     if r.status_code >= 300:
       logger.error("Alertmanager POST %s -> %s: %s", url, r.status_code, r.text[:500])
@@ -293,20 +481,35 @@ def send_alert_to_alertmanager(diff_count, missing):
 # =========
 # Program
 # =========
+def _print_json(obj):
+  """Print obj as indented JSON on stdout; orjson writes UTF-8 bytes without an intermediate str."""
+  if orjson is None:
+    print(json.dumps(obj, indent=2, ensure_ascii=False))
+    return
+  sys.stdout.flush()
+  sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+  sys.stdout.buffer.write(b"\n")
+  sys.stdout.buffer.flush()
+
 def main():
   # 1) Resolve types & attributes
   types = list_types()
-  t_component = find_type(types, TYPE_NAMES["component"])
-  t_network   = find_type(types, TYPE_NAMES["network"])
-  t_spm       = find_type(types, TYPE_NAMES["spm"])
-
-  comp_networks_attr_id, _ = attr_id_by_name_or_id(t_component, ATTR_NAMES["component_networks"])
-  spm_component_attr_id, _ = attr_id_by_name_or_id(t_spm, ATTR_NAMES["spm_component"])
-  spm_network_attr_id, _   = attr_id_by_name_or_id(t_spm, ATTR_NAMES["spm_network"])
-
-  # 2) Index external_id -> (id, name) for Component & Network
-  idx_component = build_extindex(t_component["id"])
-  idx_network   = build_extindex(t_network["id"])
+  t_component = find_type(types, TYPE_NAMES["component"], TYPE_NAMES_LC["component"])
+  t_network   = find_type(types, TYPE_NAMES["network"], TYPE_NAMES_LC["network"])
+  t_spm       = find_type(types, TYPE_NAMES["spm"], TYPE_NAMES_LC["spm"])
+
+  comp_networks_attr_id, _ = attr_id_by_name_or_id(t_component, ATTR_NAMES["component_networks"], ATTR_NAMES_LC["component_networks"])
+  spm_component_attr_id, _ = attr_id_by_name_or_id(t_spm, ATTR_NAMES["spm_component"], ATTR_NAMES_LC["spm_component"])
+  spm_network_attr_id, _   = attr_id_by_name_or_id(t_spm, ATTR_NAMES["spm_network"], ATTR_NAMES_LC["spm_network"])
+
+  # 2) Index external_id -> IdxEntry(id, name, entry) for Component & Network
+  #    (independent paginations, fetched concurrently over the shared pool)
+  with ThreadPoolExecutor(max_workers=2) as ex:
+    f_component = ex.submit(build_extindex, t_component["id"])
+    f_network   = ex.submit(build_extindex, t_network["id"])
+    idx_component = f_component.result()
+    idx_network   = f_network.result()
+  entries_component = {v.id: v.entry for v in idx_component.values()}
 
   # 3) Read SPM entries: extract (component_id, network_id)
   logger.info("Reading entries for 'Status page map' type...")
@@ -323,15 +526,16 @@ def main():
 
     # Diagnostic dump (only once, in DEBUG)
     if LOG_LEVEL == "DEBUG" and not first_dump_done:
-      logger.debug("Sample SPM attribute_values: %s", json.dumps(av, ensure_ascii=False))
+      logger.debug("Sample SPM attribute_values: %s", _LazyJson(av))
       first_dump_done = True
 
-    comp_id, comp_name = extract_single_custom(av.get(spm_component_attr_id), idx_component)
+    comp_av = av.get(spm_component_attr_id)
+    comp_id, comp_name = extract_single_fast(comp_av, idx_component)
     if not comp_id:
       logger.warning(
         "SPM '%s' without resolved component (value=%s). Verify that the Component external_id exists.",
         spm.get("name"),
-        json.dumps((av.get(spm_component_attr_id) or {}).get("value"), ensure_ascii=False)
+        _LazyJson((comp_av or {}).get("value"))
       )
       continue
 
@@ -339,17 +543,18 @@ def main():
       component_names[comp_id] = comp_name
     components_in_spm.add(comp_id)
 
-    net_id, _ = extract_single_custom(av.get(spm_network_attr_id), idx_network)
+    net_id, _ = extract_single_fast(av.get(spm_network_attr_id), idx_network)
     # net_id can be None if there is no network (expected case)
     spm_pairs[comp_id].add(net_id)
 
   # LOG #1 — Components extracted from SPM
-  comp_list_for_log = [
-    {"component_id": cid, "component_name": component_names.get(cid)}
-    for cid in sorted(components_in_spm)
-  ]
-  logger.info("Components extracted from Status page map (total=%d): %s",
-        len(comp_list_for_log), json.dumps(comp_list_for_log, ensure_ascii=False))
+  if logger.isEnabledFor(logging.INFO):
+    comp_list_for_log = [
+      {"component_id": cid, "component_name": component_names.get(cid)}
+      for cid in sorted(components_in_spm)
+    ]
+    logger.info("Components extracted from Status page map (total=%d): %s",
+          len(comp_list_for_log), _LazyJson(comp_list_for_log))
 
   # 4) For each component present in SPM, discover its actual networks
   logger.info("Inspecting components to discover their networks...")
@@ -357,14 +562,9 @@ def main():
   comp_to_discovered_networks = {}  # comp_id -> [{"network_id":..., "network_name":..., "network_external_id":...}, ...]
   unresolved_all = []               # for output JSON
 
-  cache = {}
-  def get_component(entry_id):
-    if entry_id not in cache:
-      cache[entry_id] = show_entry(entry_id)
-    return cache[entry_id]
-
   for comp_id in sorted(components_in_spm):
-    comp = get_component(comp_id)
+    # Listed entries already carry attribute_values; only fetch if it somehow wasn't listed
+    comp = entries_component.get(comp_id) or show_entry(comp_id)
     comp_name = comp.get("name", comp_id)
     component_names[comp_id] = component_names.get(comp_id) or comp_name
 
@@ -398,11 +598,16 @@ def main():
       continue
 
     existing_nets = spm_pairs.get(comp_id, set())
-    for nid, nname, nlit in nets:
-      if not nid:
-        # Unresolved → already logged above
-        continue
-      if nid not in existing_nets:
+    # Resolved networks only (unresolved → already logged above), deduplicated, first-seen order
+    nets_by_id = {}
+    for nid, nname, _ in nets:
+      if nid:
+        nets_by_id.setdefault(nid, nname)
+    missing_ids = nets_by_id.keys() - existing_nets
+    if not missing_ids:
+      continue
+    for nid, nname in nets_by_id.items():
+      if nid in missing_ids:
         missing.append({
           "component_id": comp_id,
           "component_name": comp_name,
@@ -415,19 +620,20 @@ def main():
 
   if diff_count == 0:
     # As requested: only output the count when there is no difference
-    print(json.dumps({"count": 0}, indent=2, ensure_ascii=False))
+    _print_json({"count": 0})
     return # exit the function
 
   # LOG #2 — Networks discovered for each component
-  networks_log = []
-  for comp_id in sorted(components_in_spm):
-    networks_log.append({
-      "component_id": comp_id,
-      "component_name": component_names.get(comp_id),
-      "networks": comp_to_discovered_networks.get(comp_id, [])
-    })
-  logger.info("Networks discovered for each component referenced in SPM: %s",
-        json.dumps(networks_log, indent=2, ensure_ascii=False))
+  if logger.isEnabledFor(logging.INFO):
+    networks_log = []
+    for comp_id in sorted(components_in_spm):
+      networks_log.append({
+        "component_id": comp_id,
+        "component_name": component_names.get(comp_id),
+        "networks": comp_to_discovered_networks.get(comp_id, [])
+      })
+    logger.info("Networks discovered for each component referenced in SPM: %s",
+          _LazyJson(networks_log, indent=2))
 
   # Send alert to Alertmanager (only if configured)
   if ALERTMANAGER_ENABLE == "true":
@@ -439,11 +645,12 @@ def main():
     "missing_component_network_mappings": missing,
     "unresolved_networks": unresolved_all,  # useful to fix inconsistent external_ids
     "stats": {
-      "status_page_map_entries": sum(len(v) for v in spm_pairs.values()),
+      "status_page_map_entries": count_spm,
+      "unique_pairs": sum(len(v) for v in spm_pairs.values()),
       "unique_components_in_spm": len(components_in_spm),
     }
   }
-  print(json.dumps(result, indent=2, ensure_ascii=False))
+  _print_json(result)
 
 
 if __name__ == "__main__":
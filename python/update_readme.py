@@ -5,75 +5,328 @@ Functioning: Scans the bash/ and python/ folders for scripts, extracts their des
 How to use: Run `python python/update_readme.py` from the repository root.
 """
 
-import ast
+import mmap
+import os
+import pickle
+import re
 from pathlib import Path
+from typing import Optional
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 README_PATH = REPO_ROOT / "README.md"
+# Descriptions from the previous run, keyed by (relative path, mtime_ns, size)
+CACHE_PATH = REPO_ROOT / ".readme_cache.pkl"
 
 # The static header that will be kept at the top of README.md
 README_HEADER = "# utils\nUseful scripts collection built along the journey\n"
 
+# Description block fields, in the order they are emitted
+_KEYS = ("Description:", "Functioning:", "How to use:")
+_KEYSET = frozenset(_KEYS)
 
-def extract_description(path: Path) -> str:
-  """Return the standardized description block for the script."""
+# Directories never worth descending into when looking for scripts
+_SKIP_DIRS = frozenset({".git", "venv", ".venv", "__pycache__"})
+
+# Start of a module docstring: optional BOM, blank/comment lines, then the opening quote
+_PREAMBLE = r'\ufeff?(?:[ \t\f]*(?:#[^\n]*)?\r?\n)*'
+_PREAMBLE_RE = re.compile(_PREAMBLE)
+_DOC_START_RE = re.compile(_PREAMBLE + r'[ \t\f]*([rRuU]?)("""|\'\'\'|"|\')')
+
+# First run of comment lines (shebangs skipped), found in one regex search
+_COMMENT_BLOCK_RE = re.compile(r"^[^\S\n]*#(?!!).*(?:\n[^\S\n]*#.*)*", re.M)
+
+# How much of each script is read up front to find its description block
+_HEAD_BYTES = 8192
+
+
+def _read_head(path: Path) -> tuple[str, bool]:
+  """Return the decoded start of the file and whether the file goes on past it."""
+  # Unbuffered: a single read() into the result, no BufferedReader in between
+  with open(path, "rb", buffering=0) as f:
+    data = f.read(_HEAD_BYTES)
+  partial = len(data) == _HEAD_BYTES
+  if partial:
+    # Never split a line (or a multi-byte character) at the cut
+    data = data[:data.rfind(b"\n") + 1]
+  return data.decode("utf-8", errors="replace"), partial
+
+
+def _read_all(path: Path) -> str:
+  """
+  Whole-file fallback, decoded the same way as the head. The file is mapped and
+  decoded straight from the page cache, without an intermediate bytes copy.
+  """
+  with open(path, "rb", buffering=0) as f:
+    size = os.fstat(f.fileno()).st_size
+    if not size:
+      return ""
+    # Read-ahead hints for a front-to-back scan, where the platform has them
+    if hasattr(os, "posix_fadvise"):
+      os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+      if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+      return str(mm, "utf-8", "replace")
+
+
+def _find_close(text: str, quote: str, start: int) -> int:
+  """Index of the closing quote at/after start, or -1 (a backslash escapes the next char)."""
+  single = len(quote) == 1
+  i = start
+  while True:
+    j = text.find(quote, i)
+    if j == -1:
+      return -1
+    if single and "\n" in text[i:j]:
+      return -1
+    k = j
+    while k > start and text[k - 1] == "\\":
+      k -= 1
+    if (j - k) % 2 == 0:
+      return j
+    i = j + 1
+
+
+def _docstring_lines(text: str, partial: bool) -> Optional[list[str]]:
+  """
+  Lines of the module docstring, found by scanning the text instead of parsing it.
+  None means a partial read was not enough to decide: the docstring, or the blank and
+  comment lines before it, run past its end.
+  """
+  m = _DOC_START_RE.match(text)
+  if not m:
+    if partial and _PREAMBLE_RE.match(text).end() == len(text):
+      return None
+    return []
+  prefix, quote = m.groups()
+  start = m.end()
+  end = _find_close(text, quote, start)
+  if end == -1:
+    return None if partial and len(quote) == 3 else []
+  # A docstring is a whole statement: nothing but a comment or ';' may follow it
+  after = end + len(quote)
+  eol = text.find("\n", after)
+  rest = text[after:eol if eol != -1 else len(text)].strip()
+  if rest and rest[0] not in "#;":
+    return []
+  doc = text[start:end]
+  if "\\" in doc and prefix not in ("r", "R"):
+    try:
+      doc = doc.encode("latin-1", "backslashreplace").decode("unicode_escape")
+    except UnicodeDecodeError:
+      # A bad \u/\x/\N escape: Python rejects the file, so there is no docstring
+      return []
+  doc = doc.expandtabs()
+  return [l.strip() for l in doc.strip().splitlines() if l.strip()]
+
+
+def _comment_lines(text: str) -> tuple[list[str], bool]:
+  """Return the leading comment block and whether it ended before the text did."""
+  m = _COMMENT_BLOCK_RE.search(text)
+  if not m:
+    return [], False
   lines: list[str] = []
-  if path.suffix == ".py":
-    with path.open("r", encoding="utf-8") as f:
-      try:
-        module = ast.parse(f.read())
-        doc = ast.get_docstring(module)
-        if doc:
-          lines = [l.strip() for l in doc.strip().splitlines() if l.strip()]
-      except SyntaxError:
-        pass
-  if not lines:
-    with path.open("r", encoding="utf-8") as f:
-      for line in f:
-        s = line.strip()
-        if s.startswith("#!"):
-          continue
-        if s.startswith("#"):
-          lines.append(s.lstrip("# "))
-        elif lines and s == "":
-          break
-        elif lines:
+  for line in m.group().splitlines():
+    s = line.strip()
+    if s.startswith("#!"):
+      continue
+    if not s.startswith("#"):
+      return lines, True
+    lines.append(s.lstrip("# "))
+  return lines, m.end() + 1 < len(text)
+
+
+def _format_description(lines: list[str]) -> str:
+  """Keep the standard fields in their declared order, or fall back to the raw lines."""
+  found: dict[str, str] = {}
+  for l in lines:
+    head, sep, _ = l.partition(":")
+    if sep:
+      key = head + sep
+      if key in _KEYSET and key not in found:
+        found[key] = l
+        if len(found) == len(_KEYS):
           break
-  fields = []
-  for key in ("Description:", "Functioning:", "How to use:"):
-    for l in lines:
-      if l.startswith(key):
-        fields.append(l)
-        break
-  if fields:
-    return "\n".join(fields)
-  if lines:
-    return " ".join(lines)
-  return "No description available"
+  # str.join builds a list from a generator anyway; hand it one directly
+  return (
+    "\n".join([found[k] for k in _KEYS if k in found])
+    or (" ".join(lines) if lines else "No description available")
+  )
+
+
+def _header_comments(path: Path, text: str, partial: bool) -> list[str]:
+  """Leading comment block, reading past the head only if the block runs into the cut."""
+  lines, ended = _comment_lines(text)
+  if partial and not ended:
+    lines, _ = _comment_lines(_read_all(path))
+  return lines
+
+
+def _desc_sh(path: Path) -> str:
+  """Description of a shell script: its leading comment block."""
+  text, partial = _read_head(path)
+  return _format_description(_header_comments(path, text, partial))
+
+
+def _desc_py(path: Path) -> str:
+  """Description of a Python script: its module docstring, else its leading comments."""
+  text, partial = _read_head(path)
+  lines = _docstring_lines(text, partial)
+  if lines is None:
+    text, partial = _read_all(path), False
+    lines = _docstring_lines(text, partial)
+  if not lines:
+    lines = _header_comments(path, text, partial)
+  return _format_description(lines)
+
+
+def extract_description(path: Path) -> str:
+  """Return the standardized description block for the script."""
+  return _desc_py(path) if path.suffix == ".py" else _desc_sh(path)
+
+
+def _walk_scripts(folder: Path):
+  """Yield every .sh/.py file under folder in a single scandir pass per directory."""
+  stack = [os.fspath(folder)]
+  while stack:
+    try:
+      it = os.scandir(stack.pop())
+    except OSError:
+      continue
+    with it:
+      for entry in it:
+        # d_type answers is_dir() without a stat() on most filesystems
+        if entry.is_dir():
+          if entry.name not in _SKIP_DIRS and not entry.is_symlink():
+            stack.append(entry.path)
+        elif entry.name.endswith((".sh", ".py")):
+          yield Path(entry.path)
 
 
 def collect_scripts() -> list[Path]:
   """Return all shell and Python scripts under bash/ and python/ folders."""
   scripts: list[Path] = []
   for folder in (REPO_ROOT / "bash", REPO_ROOT / "python"):
-    if folder.exists():
-      scripts.extend(sorted(folder.rglob("*.sh")))
-      scripts.extend(sorted(folder.rglob("*.py")))
+    found = list(_walk_scripts(folder))
+    # One sort per folder: .sh files first, then .py, each in path order
+    found.sort(key=lambda p: (p.suffix != ".sh", p))
+    scripts.extend(found)
   return scripts
 
 
-def generate_readme_content() -> str:
-  sections = []
+def _self_stamp() -> tuple[int, int]:
+  """Identify this version of the generator, so edits to it invalidate the cache."""
+  st = os.stat(__file__)
+  return (st.st_mtime_ns, st.st_size)
+
+
+def load_cache() -> dict:
+  try:
+    with CACHE_PATH.open("rb") as f:
+      stamp, cache = pickle.load(f)
+  except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+    return {}
+  return cache if stamp == _self_stamp() else {}
+
+
+def save_cache(cache: dict) -> None:
+  try:
+    with CACHE_PATH.open("wb") as f:
+      pickle.dump((_self_stamp(), cache), f, protocol=pickle.HIGHEST_PROTOCOL)
+  except OSError:
+    pass
+
+
+def stat_scripts() -> list[tuple[Path, Path, tuple[str, int, int]]]:
+  """Return (path, relative path, cache key) for every script, in README order."""
+  entries = []
   for script in collect_scripts():
-    desc = extract_description(script)
     rel = script.relative_to(REPO_ROOT)
-    sections.append(f"## {rel}\n{desc}\n")
-  return README_HEADER + "\n" + "\n".join(sections) + "\n"
+    st = script.stat()
+    entries.append((script, rel, (str(rel), st.st_mtime_ns, st.st_size)))
+  return entries
+
+
+def readme_is_fresh(scripts: list, cache: dict) -> bool:
+  """
+  True when README.md was last written or confirmed up to date (cache saved) after
+  every script and this generator changed, and that cache covers exactly the current
+  scripts (so additions, removals and renames are caught too). Without a cache, e.g.
+  on a fresh CI checkout where every mtime is the checkout time, the answer is False.
+  """
+  if not cache:
+    return False
+  try:
+    checked = max(README_PATH.stat().st_mtime_ns, CACHE_PATH.stat().st_mtime_ns)
+  except OSError:
+    return False
+  newest = max((key[1] for _, _, key in scripts), default=0)
+  if max(newest, _self_stamp()[0]) >= checked:
+    return False
+  return len(scripts) == len(cache) and all(key in cache for _, _, key in scripts)
+
+
+def generate_readme_content(
+  cache: Optional[dict] = None, seen: Optional[dict] = None, scripts: Optional[list] = None
+) -> str:
+  """
+  Build README.md. Descriptions found in `cache` (unchanged scripts) are reused;
+  every description used is recorded in `seen` under the same key.
+  """
+  cache = cache if cache is not None else {}
+  if scripts is None:
+    scripts = stat_scripts()
+  entries = [(script, rel, key, cache.get(key)) for script, rel, key in scripts]
+
+  # Cache misses are read concurrently; map() keeps them in script order
+  misses = [script for script, _, _, desc in entries if desc is None]
+  if misses:
+    # Imported here: it pulls in threading and logging, which cached runs never need
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(32, len(misses))) as ex:
+      fresh = iter(list(ex.map(extract_description, misses)))
+  # One flat list of pieces and a single join at the end: "## rel\ndesc\n" blocks
+  # separated by blank lines, then a final newline
+  parts = [README_HEADER, "\n"]
+  for _, _, key, desc in entries:
+    if desc is None:
+      desc = next(fresh)
+    if seen is not None:
+      seen[key] = desc
+    parts.extend(("## ", key[0], "\n", desc, "\n\n"))  # key[0] is the relative path
+  if not entries:
+    parts.append("\n")
+  return "".join(parts)
+
+
+def write_file(path: Path, data: bytes) -> None:
+  """Write data with as few write() syscalls as the kernel allows (normally one)."""
+  fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+  try:
+    view = memoryview(data)
+    while view:
+      view = view[os.write(fd, view):]
+  finally:
+    os.close(fd)
 
 
 def main() -> None:
-  content = generate_readme_content()
-  README_PATH.write_text(content, encoding="utf-8")
+  cache = load_cache()
+  scripts = stat_scripts()
+  if readme_is_fresh(scripts, cache):
+    return
+  seen: dict = {}
+  data = generate_readme_content(cache, seen, scripts).encode("utf-8")
+  # Leave README.md (and its mtime) alone when the output is the same
+  try:
+    unchanged = README_PATH.read_bytes() == data
+  except OSError:
+    unchanged = False
+  if not unchanged:
+    write_file(README_PATH, data)
+  # Only the scripts still present are kept, so the cache never grows stale
+  if seen != cache:
+    save_cache(seen)
 
 
 if __name__ == "__main__":